@@ -59,11 +59,13 @@ class PairID(object):
         """Initialize a :class:`PairID` object.
 
         Sets up labels for method names and run labels (IDs) and initializes a
-        pandas DataFrame object.
+        pandas DataFrame object, as well as a dictionary mapping (method, run
+        ID) tuples to simulation IDs for fast lookups.
         """
         self.ilbl = ['Name', 'Run ID']
         self.clbl = ['Sim ID']
         self.data = pd.DataFrame()
+        self._sim_ids = {}
         self.num_sims = 0
         self.num_methods = 0
 
@@ -80,9 +82,10 @@ class PairID(object):
         num_new_sims = len(run_ids)
         tuples = list(it.product([method], run_ids))
         df_idx = pd.MultiIndex.from_tuples(tuples, names=self.ilbl)
-        sim_ids = np.asarray(xrange(num_new_sims)) + self.num_sims
+        sim_ids = np.asarray(range(num_new_sims)) + self.num_sims
         df_new = pd.DataFrame(sim_ids, df_idx, self.clbl)
-        self.data = self.data.append(df_new)
+        self.data = pd.concat([self.data, df_new])
+        self._sim_ids.update(zip(tuples, (int(sim_id) for sim_id in sim_ids)))
         self.num_sims += num_new_sims
         self.num_methods += 1 #len(self.data[self.column[0]].count())
 
@@ -111,7 +114,7 @@ class PairID(object):
         if j < i:
             temp, i = i, j
             j = temp
-        return (self.num_sims*i) + j - (i+2)*(i+1)/2
+        return (self.num_sims*i) + j - (i+2)*(i+1)//2
 
 
     def get_pair_id(self, sim1, sim2, vectorform=True):
@@ -149,8 +152,7 @@ class PairID(object):
         :Returns:
           int, the simulation ID
         """
-        sim_tuple = self._str2tup(sim)
-        return self.data.loc[sim_tuple, self.clbl[0]]
+        return self._sim_ids[self._str2tup(sim)]
 
 
     def _str2tup(self, name):
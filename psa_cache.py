@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk caching of PSA results
+==============================
+
+Generating (aligned) paths with :meth:`PSAnalysis.generate_paths` fits every
+frame of every trajectory to the reference structure, which has to be repeated
+on each invocation of a script although the result only depends on the input
+files and the selections. :func:`generate_paths` stores the paths as numpy
+files in a cache directory, keyed by the modification times of the input files
+and the selection strings, and memory-maps them on subsequent runs:
+
+>>> import psa_cache
+>>> psa_cache.generate_paths(psa_full, filenames, ref_selection,
+...                          align=True, store=True)
+
+The distance matrices computed from the paths are cached in the same way by
+:func:`run`:
+
+>>> psa_cache.run(psa_full, 'discrete_frechet', filenames, ref_selection)
+
+"""
+
+import hashlib
+import inspect
+import os
+
+import numpy as np
+import MDAnalysis.analysis.psa as psa
+
+
+def cache_key(filenames, *args):
+    """Return a key identifying a set of input files and parameters.
+
+    :Arguments:
+      *filenames*
+         list of strings, names of the input files; only their names and
+         modification times enter the key
+      *args*
+         further (string) parameters to include in the key
+
+    :Returns:
+      string, hexadecimal digest
+    """
+    h = hashlib.sha1()
+    for filename in filenames:
+        h.update(f'{filename}:{os.path.getmtime(filename)!r};'.encode())
+    for arg in args:
+        h.update(f'{arg!r};'.encode())
+    return h.hexdigest()
+
+
+def generate_paths(psa_obj, filenames, *args, cachedir='cache', **kwargs):
+    """Generate the paths of *psa_obj*, reusing cached paths if possible.
+
+    On a cache miss, :meth:`PSAnalysis.generate_paths` is called with
+    *kwargs* and the paths are saved to the cache; on a cache hit, the saved
+    paths are memory-mapped (read-only) into ``psa_obj.paths``, and the
+    number of paths and atoms are set as :meth:`PSAnalysis.generate_paths`
+    would. The path and alignment selections of *psa_obj* are always part of
+    the cache key.
+
+    :Arguments:
+      *psa_obj*
+         :class:`PSAnalysis`
+      *filenames*
+         list of strings, names of all files the paths are computed from
+      *args*
+         further parameters the paths depend on (e.g. selection strings)
+      *cachedir*
+         string, directory holding the cache [``'cache'``]
+      *kwargs*
+         passed to :meth:`PSAnalysis.generate_paths`
+
+    :Returns:
+      bool, ``True`` if the paths were loaded from the cache
+    """
+    key = cache_key(filenames, psa_obj.path_select, psa_obj.select, args,
+                    sorted(kwargs.items()))
+    pathdir = os.path.join(cachedir, key)
+    pathfiles = [os.path.join(pathdir, f'path_{i:d}.npy')
+                 for i in range(len(psa_obj.universes))]
+
+    if all(os.path.exists(pathfile) for pathfile in pathfiles):
+        psa_obj.paths = [np.load(pathfile, mmap_mode='r')
+                         for pathfile in pathfiles]
+        psa_obj.npaths = len(psa_obj.paths)
+        psa_obj.natoms, _ = psa.get_coord_axes(psa_obj.paths[0])
+        return True
+
+    psa_obj.generate_paths(**kwargs)
+    if not os.path.exists(pathdir):
+        os.makedirs(pathdir)
+    for pathfile, path in zip(pathfiles, psa_obj.paths):
+        np.save(pathfile, path)
+    return False
+
+
+def _paths_digest(paths):
+    """Return a digest of the contents, shapes and dtypes of *paths*.
+
+    :Arguments:
+      *paths*
+         list of numpy.ndarrays
+
+    :Returns:
+      string, hexadecimal digest
+    """
+    h = hashlib.sha1()
+    for path in paths:
+        h.update(f'{path.dtype.str}{path.shape!r};'.encode())
+        h.update(memoryview(np.ascontiguousarray(path)).cast('B'))
+    return h.hexdigest()
+
+
+def run(psa_obj, metric, filenames, *args, cachedir='cache', runner=None):
+    """Compute the distance matrix of *psa_obj*, reusing a cached one if
+    possible.
+
+    On a cache miss, the distance matrix is computed with *runner* and saved
+    to the cache; on a cache hit, the saved matrix is loaded into
+    ``psa_obj.D``. Besides *filenames* and *args*, the cache key includes the
+    path selection, the contents of the paths (and so their alignment), and
+    the function that implements *metric* together with the modification time
+    of its source file.
+
+    :Arguments:
+      *psa_obj*
+         :class:`PSAnalysis`, with paths already generated
+      *metric*
+         string, name of the path metric
+      *filenames*
+         list of strings, names of all files the paths are computed from
+      *args*
+         further parameters the paths depend on (e.g. selection strings)
+      *cachedir*
+         string, directory holding the cache [``'cache'``]
+      *runner*
+         function, called as ``runner(psa_obj, metric)`` to compute the
+         distance matrix; ``None`` uses :meth:`PSAnalysis.run` [``None``]
+
+    :Returns:
+      bool, ``True`` if the distance matrix was loaded from the cache
+    """
+    metric_func = psa.get_path_metric_func(metric)
+    key = cache_key(list(filenames) + [inspect.getfile(metric_func)],
+                    psa_obj.path_select, args,
+                    f'{metric_func.__module__}.{metric_func.__qualname__}',
+                    _paths_digest(psa_obj.paths))
+    distfile = os.path.join(cachedir, key, f'{metric}.npy')
+
+    if os.path.exists(distfile):
+        psa_obj.D = np.load(distfile)
+        return True
+
+    if runner is None:
+        psa_obj.run(metric=metric)
+    else:
+        runner(psa_obj, metric)
+    if not os.path.exists(os.path.dirname(distfile)):
+        os.makedirs(os.path.dirname(distfile))
+    np.save(distfile, psa_obj.D)
+    return False
@@ -35,10 +35,16 @@ hierarchical clustering of the distance matrix is also written to
 
 """
 
+import numpy as np
 from MDAnalysis import Universe
 from MDAnalysis.analysis.align import rotation_matrix
 from MDAnalysis.analysis.psa import PSAnalysis
 
+import psa_cache
+import psa_kernels
+import psa_sims
+from psa_parallel import parallel_run
+
 if __name__ == '__main__':
 
     print("Generating AdK CORE C-alpha reference coordinates and structure...")
@@ -48,14 +54,22 @@ if __name__ == '__main__':
     ca_closed = u_closed.select_atoms('name CA')
     ca_open = u_open.select_atoms('name CA')
 
-    # Move centers-of-mass of C-alphas of each structure's CORE domain to origin
+    # Select the C-alpha CORE of each structure once and work with the
+    # coordinates of the selections from here on
     adkCORE_resids = "(resid 1:29 or resid 60:121 or resid 160:214)"
-    u_closed.atoms.translate(-ca_closed.select_atoms(adkCORE_resids).center_of_mass())
-    u_open.atoms.translate(-ca_open.select_atoms(adkCORE_resids).center_of_mass())
+    core_closed = ca_closed.select_atoms(adkCORE_resids)
+    core_open = ca_open.select_atoms(adkCORE_resids)
+    closed_ca_core_coords = core_closed.positions
+    open_ca_core_coords = core_open.positions
 
-    # Get C-alpha CORE coordinates for each structure
-    closed_ca_core_coords = ca_closed.select_atoms(adkCORE_resids).positions
-    open_ca_core_coords = ca_open.select_atoms(adkCORE_resids).positions
+    # Move centers-of-mass of C-alphas of each structure's CORE domain to origin
+    # (all C-alphas have the same mass, so the center of mass is the mean)
+    com_closed = closed_ca_core_coords.mean(axis=0)
+    com_open = open_ca_core_coords.mean(axis=0)
+    u_closed.atoms.translate(-com_closed)
+    u_open.atoms.translate(-com_open)
+    closed_ca_core_coords -= com_closed
+    open_ca_core_coords -= com_open
 
     # Compute rotation matrix, R, that minimizes rmsd between the C-alpha COREs
     R, rmsd_value = rotation_matrix(open_ca_core_coords, closed_ca_core_coords)
@@ -63,63 +77,59 @@ if __name__ == '__main__':
     # Rotate open structure to align its C-alpha CORE to closed structure's
     # C-alpha CORE
     u_open.atoms.rotate(R)
+    open_ca_core_coords = core_open.positions
 
     # Generate reference structure coordinates: take average positions of
     # C-alpha COREs of open and closed structures (after C-alpha CORE alignment)
-    reference_coordinates = 0.5*(ca_closed.select_atoms(adkCORE_resids).positions
-        + ca_open.select_atoms(adkCORE_resids).positions)
+    # (in a single buffer, without temporary arrays)
+    reference_coordinates = np.empty_like(closed_ca_core_coords)
+    np.add(closed_ca_core_coords, open_ca_core_coords, out=reference_coordinates)
+    reference_coordinates *= 0.5
 
     # Generate Universe for reference structure with above reference coordinates
     u_ref = Universe('structs/adk1AKE.pdb')
-    u_ref.atoms.translate(-u_ref.select_atoms(adkCORE_resids).CA.center_of_mass())
-    u_ref.select_atoms(adkCORE_resids).CA.set_positions(reference_coordinates)
+    core_ref = u_ref.select_atoms('name CA').select_atoms(adkCORE_resids)
+    u_ref.atoms.translate(-core_ref.center_of_mass())
+    core_ref.positions = reference_coordinates
 
     print("Building collection of simulations...")
     # List of method names (same as directory names)
     method_names = ['DIMS', 'FRODA', 'GOdMD', 'MDdMD', 'rTMD-F', 'rTMD-S',      \
                     'ANMP', 'iENM', 'MAP', 'MENM-SD', 'MENM-SP',                \
                     'Morph', 'LinInt']
-    labels = [] # Heat map labels
-    simulations = [] # List of simulation topology/trajectory filename pairs
-    universes = [] # List of MDAnalysis Universes representing simulations
-
-    # Build list of simulations, each represented by a pair of filenames
-    # ([topology filename], [trajectory filename]). Generate corresponding label
-    # list.
-    for method in method_names:
-        # Note: DIMS uses the PSF topology format
-        topname = 'top.psf' if 'DIMS' in method or 'TMD' in method else 'top.pdb'
-        pathname = 'path.dcd'
-        method_dir = 'methods/{}'.format(method)
-        if method is not 'LinInt':
-            for run in xrange(1, 4): # 3 runs per method
-                run_dir = '{}/{:03n}'.format(method_dir, run)
-                topology = '{}/{}'.format(method_dir, topname)
-                trajectory = '{}/{}'.format(run_dir, pathname)
-                labels.append(method + '(' + str(run) + ')')
-                simulations.append((topology, trajectory))
-        else: # only one LinInt trajectory
-            topology = '{}/{}'.format(method_dir, topname)
-            trajectory = '{}/{}'.format(method_dir, pathname)
-            labels.append(method)
-            simulations.append((topology, trajectory))
-
-    # Generate simulation list represented as Universes. Each item, sim, in
-    # simulations is a topology/trajectory filename pair that is unpacked into
-    # an argument list with the "splat" ("*") operator.
-    for sim in simulations:
-        universes.append(Universe(*sim))
+
+    # Build list of simulations, each represented by a triple
+    # ([topology filename], [trajectory filename], [heat map label]), with
+    # three runs per method and only one LinInt trajectory.
+    simulations = [psa_sims.simulation(method, run, 'path.dcd')
+                   for method in method_names
+                   for run in ([None] if method == 'LinInt' else range(1, 4))]
+    labels = [label for _, _, label in simulations] # Heat map labels
+
+    # Generate simulation list represented as Universes. Universes are read in
+    # a thread pool, so that reading of the trajectory files overlaps; they are
+    # read on every run, even when the paths are loaded from the cache.
+    universes = psa_sims.load_universes(simulations)
 
     print("Initializing Path Similarity Analysis...")
     ref_selection = "name CA and " + adkCORE_resids
-    psa_full = PSAnalysis(universes, reference=u_ref, ref_select=ref_selection,
+    psa_full = PSAnalysis(universes, reference=u_ref, select=ref_selection,
                         path_select="name CA", labels=labels)
 
     print("Generating Path objects from aligned trajectories...")
-    psa_full.generate_paths(align=True, store=True)
+    # Aligned paths only depend on the input files and the selections, so they
+    # are cached in the 'cache' directory and reused on subsequent runs
+    input_files = ['structs/adk1AKE.pdb', 'structs/adk4AKE.pdb']            \
+                  + [filename for sim in simulations for filename in sim[:2]]
+    psa_cache.generate_paths(psa_full, input_files, ref_selection,
+                             align=True, store=True)
+
+    # Use the compiled path metrics and clustering for the analyses below
+    psa_kernels.install()
 
     print("Calculating Hausdorff distance matrix...")
-    psa_full.run(metric='hausdorff')
+    psa_cache.run(psa_full, 'hausdorff', input_files, ref_selection,
+                  runner=parallel_run)
 
     print("Plotting heat map-dendrogram for hierarchical (Ward) clustering...")
     psa_full.plot(filename='dh_ward_psa-full.pdf', linkage='ward');
@@ -129,7 +139,8 @@ if __name__ == '__main__':
                                      linkage='ward');
 
     print("Calculating (discrete) Fréchet distance matrix...")
-    psa_full.run(metric='discrete_frechet')
+    psa_cache.run(psa_full, 'discrete_frechet', input_files, ref_selection,
+                  runner=parallel_run)
 
     print("Plotting heat map-dendrogram for hierarchical (Ward) clustering...")
     psa_full.plot(filename='df_ward_psa-full.pdf', linkage='ward');
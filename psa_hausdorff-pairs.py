@@ -35,52 +35,44 @@ hierarchical clustering of the distance matrix is also written to
 
 """
 
-from MDAnalysis import Universe
 from MDAnalysis.analysis.psa import PSAnalysis
 from pair_id import PairID
 
+import psa_cache
+import psa_kernels
+import psa_sims
+
 if __name__ == '__main__':
 
     print("Building collection of simulations...")
     method_names = ['DIMS', 'FRODA', 'GOdMD', 'MDdMD', 'rTMD-F', 'rTMD-S',      \
                     'ANMP', 'iENM', 'MAP', 'MENM-SD', 'MENM-SP',                \
                     'Morph', 'LinInt']
-    labels = [] # Heat map labels
-    simulations = [] # List of simulation topology/trajectory filename pairs
-    universes = [] # List of MDAnalysis Universes representing simulations
-
-    # Build list of simulations, each represented by a pair of filenames
-    # ([topology filename], [trajectory filename]). Generate corresponding label
-    # list.
-    for method in method_names:
-        # Note: DIMS uses the PSF topology format
-        topname = 'top.psf' if 'DIMS' in method or 'TMD' in method else 'top.pdb'
-        pathname = 'fitted_psa.dcd'
-        method_dir = 'methods/{}'.format(method)
-        if method is not 'LinInt':
-            for run in xrange(1, 4): # 3 runs per method
-                run_dir = '{}/{:03n}'.format(method_dir, run)
-                topology = '{}/{}'.format(method_dir, topname)
-                trajectory = '{}/{}'.format(run_dir, pathname)
-                labels.append(method + '(' + str(run) + ')')
-                simulations.append((topology, trajectory))
-        else: # only one LinInt trajectory
-            topology = '{}/{}'.format(method_dir, topname)
-            trajectory = '{}/{}'.format(method_dir, pathname)
-            labels.append(method)
-            simulations.append((topology, trajectory))
-
-    # Generate simulation list represented as Universes. Each item, sim, in
-    # simulations is a topology/trajectory filename pair that is unpacked into
-    # an argument list with the "splat" ("*") operator.
-    for sim in simulations:
-        universes.append(Universe(*sim))
+
+    # Build list of simulations, each represented by a triple
+    # ([topology filename], [trajectory filename], [heat map label]), with
+    # three runs per method and only one LinInt trajectory.
+    simulations = [psa_sims.simulation(method, run)
+                   for method in method_names
+                   for run in ([None] if method == 'LinInt' else range(1, 4))]
+    labels = [label for _, _, label in simulations] # Heat map labels
+
+    # Generate simulation list represented as Universes. Universes are read in
+    # a thread pool, so that reading of the trajectory files overlaps; they are
+    # read on every run, even when the paths are loaded from the cache.
+    universes = psa_sims.load_universes(simulations)
 
     print("Initializing Path Similarity Analysis...")
     psa_hpa = PSAnalysis(universes, path_select='name CA', labels=labels)
 
     print("Generating Path objects from trajectories...")
-    psa_hpa.generate_paths()
+    # Paths only depend on the trajectory files and the path selection, so
+    # they are cached in the 'cache' directory and reused on subsequent runs
+    input_files = [filename for sim in simulations for filename in sim[:2]]
+    psa_cache.generate_paths(psa_hpa, input_files)
+
+    # Use the compiled nearest neighbor search for the analysis below
+    psa_kernels.install()
 
     print("Performing full Hausdorff pairs analysis for all pairs of paths...")
     psa_hpa.run_pairs_analysis(neighbors=True, hausdorff_pairs=True)
@@ -107,10 +99,10 @@ if __name__ == '__main__':
 
     print("Plotting nearest neighbors as a function of normalized progress (by" \
         + " frame for:")
-    print("    1. comparison {:d}, {} to {}...".format(pid1, s1, s2))
+    print(f"    1. comparison {pid1:d}, {s1} to {s2}...")
     psa_hpa.plot_nearest_neighbors(filename='nn_dims1_dims2.pdf', idx=pid1,     \
                                    labels=(s1, s2))
 
-    print("    2. comparison {:d}, {} to {}...".format(pid2, s2, s3))
+    print(f"    2. comparison {pid2:d}, {s2} to {s3}...")
     psa_hpa.plot_nearest_neighbors(filename='nn_dims2_tmds3.pdf', idx=pid2,     \
                                    labels=(s2, s3))
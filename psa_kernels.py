@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled path metric kernels for PSA
+====================================
+
+Drop-in replacements for the path metrics in :mod:`MDAnalysis.analysis.psa`
+that are compiled with :mod:`numba`. The pure Python implementation of the
+discrete Fréchet distance fills the coupling array with a memoized recursion,
+so that the cost of each of the O(nm) entries is dominated by interpreter
+overhead; here the same recursion is linearized into two nested loops. The
+matrix of distances between frames is computed beforehand in a compiled loop
+that runs in parallel over its rows.
+Paths are read from the trajectories in single precision, and the kernels
+keep both the coordinates and the distances between frames in single
+precision throughout, which halves the memory traffic of filling the distance
+matrix compared to double precision. The Hausdorff distance and
+the nearest neighbors of the frames of a pair of paths are obtained from the
+same distance matrix with reductions that run in parallel over its rows and
+columns.
+
+Hierarchical clustering of the distance matrix (as done by
+:meth:`PSAnalysis.cluster` for the heat map plots) is delegated to
+:mod:`fastcluster`, a C++ implementation of the linkage methods of
+:func:`scipy.cluster.hierarchy.linkage` with the same interface, which uses
+the nearest-neighbor chain algorithm for Ward linkage.
+
+Calling :func:`install` replaces the corresponding functions in
+:mod:`MDAnalysis.analysis.psa` (or the module it re-exports them from, e.g.
+:mod:`pathsimanalysis` in MDAnalysis 2.8 and later) and
+:mod:`scipy.cluster.hierarchy`, so that
+:class:`PSAnalysis` picks up the compiled versions without any other changes
+to a script:
+
+>>> import psa_kernels
+>>> psa_kernels.install()
+>>> psa_short.run(metric='discrete_frechet')
+
+"""
+
+import sys
+
+import fastcluster
+import numpy as np
+import scipy.cluster.hierarchy as hier
+from numba import jit, prange
+
+import MDAnalysis.analysis.psa as psa
+
+
+@jit(nopython=True, parallel=True, fastmath=True, boundscheck=False,
+     cache=True)
+def _msd_matrix(P, Q):
+    """Return the matrix of summed squared distances between frames.
+
+    The squared coordinate differences are summed directly (rather than
+    expanded into norms and dot products), so that identical frames are
+    exactly zero apart; rows of the matrix are filled in parallel.
+
+    :Arguments:
+      *P*
+         numpy.ndarray, float32 path with shape (n, 3N), one frame per row
+      *Q*
+         numpy.ndarray, float32 path with shape (m, 3N), one frame per row
+
+    :Returns:
+      numpy.ndarray, (n, m) array whose (i, j) entry is the sum over all atoms
+      of the squared distances between frame i of *P* and frame j of *Q*
+    """
+    n, m, k = P.shape[0], Q.shape[0], P.shape[1]
+    d = np.empty((n, m), dtype=np.float32)
+    for i in prange(n):
+        for j in range(m):
+            acc = np.float32(0.0)
+            for c in range(k):
+                diff = P[i, c] - Q[j, c]
+                acc += diff*diff
+            d[i, j] = acc
+    return d
+
+
+@jit(nopython=True, fastmath=True, boundscheck=False, cache=True)
+def _frechet_coupling(d):
+    """Return the coupling distance of two full paths.
+
+    Fills the coupling array, *ca*, in place, row by row, with the same
+    recursion used by :func:`MDAnalysis.analysis.psa.discrete_frechet`.
+
+    :Arguments:
+      *d*
+         numpy.ndarray, (n, m) array of (squared) distances between frames
+
+    :Returns:
+      float, the coupling distance between the end frames of the paths
+    """
+    n, m = d.shape
+    ca = np.empty((n, m), dtype=d.dtype)
+    ca[0, 0] = d[0, 0]
+    for j in range(1, m):
+        ca[0, j] = max(ca[0, j-1], d[0, j])
+    for i in range(1, n):
+        ca[i, 0] = max(ca[i-1, 0], d[i, 0])
+        for j in range(1, m):
+            ca[i, j] = max(min(ca[i-1, j], ca[i-1, j-1], ca[i, j-1]), d[i, j])
+    return ca[n-1, m-1]
+
+
+@jit(nopython=True, parallel=True, fastmath=True, boundscheck=False,
+     cache=True)
+def _nearest_neighbors(d):
+    """Return the nearest neighbors of the frames of two paths.
+
+    :Arguments:
+      *d*
+         numpy.ndarray, (n, m) array of (squared) distances between frames
+
+    :Returns:
+      tuple (dP, iP, dQ, iQ) of numpy.ndarrays: for each of the n frames of
+      the first path, the (squared) distance to and the index of the nearest
+      frame of the second path, followed by the same for each of the m frames
+      of the second path; ties resolve to the lowest index as in
+      :func:`numpy.argmin`
+    """
+    n, m = d.shape
+    dP = np.empty(n, dtype=d.dtype)
+    iP = np.empty(n, dtype=np.int64)
+    dQ = np.empty(m, dtype=d.dtype)
+    iQ = np.empty(m, dtype=np.int64)
+    for i in prange(n):
+        k = 0
+        for j in range(1, m):
+            if d[i, j] < d[i, k]:
+                k = j
+        dP[i], iP[i] = d[i, k], k
+    for j in prange(m):
+        k = 0
+        for i in range(1, n):
+            if d[i, j] < d[k, j]:
+                k = i
+        dQ[j], iQ[j] = d[k, j], k
+    return dP, iP, dQ, iQ
+
+
+def _flatten(P):
+    """Return path *P* as a C-contiguous (n_frames, 3N) float32 array.
+
+    :Arguments:
+      *P*
+         numpy.ndarray, path with shape (n_frames, N, 3) or (n_frames, 3N)
+    """
+    return np.ascontiguousarray(P, dtype=np.float32).reshape(len(P), -1)
+
+
+def _distance_matrix(P, Q):
+    """Return the number of atoms and the matrix of (squared) distances
+    between the frames of paths *P* and *Q*.
+
+    :Arguments:
+      *P*
+         numpy.ndarray, path with shape (n_frames, N, 3) or (n_frames, 3N)
+      *Q*
+         numpy.ndarray, path with the same number of atoms as *P*
+
+    :Returns:
+      (int, numpy.ndarray), the number of atoms N and the (n, m) distance
+      matrix (see :func:`_msd_matrix`)
+
+    :Raises:
+      ValueError, if *P* and *Q* do not have the same number of atoms
+    """
+    N, axis = psa.get_coord_axes(P)
+    NQ, axisQ = psa.get_coord_axes(Q)
+    if N != NQ:
+        raise ValueError("P and Q must have matching sizes")
+    return N, _msd_matrix(_flatten(P), _flatten(Q))
+
+
+def discrete_frechet(P, Q):
+    """Calculate the discrete Fréchet distance between two paths.
+
+    Same interface and result as
+    :func:`MDAnalysis.analysis.psa.discrete_frechet`.
+
+    :Arguments:
+      *P*
+         numpy.ndarray, path with shape (n_frames, N, 3) or (n_frames, 3N)
+      *Q*
+         numpy.ndarray, path with the same number of atoms as *P*
+
+    :Returns:
+      float, the discrete Fréchet distance between paths *P* and *Q*
+    """
+    N, d = _distance_matrix(P, Q)
+    return (float(_frechet_coupling(d)) / N)**0.5
+
+
+def hausdorff(P, Q):
+    """Calculate the Hausdorff distance between two paths.
+
+    Same interface and result as :func:`MDAnalysis.analysis.psa.hausdorff`.
+
+    :Arguments:
+      *P*
+         numpy.ndarray, path with shape (n_frames, N, 3) or (n_frames, 3N)
+      *Q*
+         numpy.ndarray, path with the same number of atoms as *P*
+
+    :Returns:
+      float, the Hausdorff distance between paths *P* and *Q*
+    """
+    N, d = _distance_matrix(P, Q)
+    dP, iP, dQ, iQ = _nearest_neighbors(d)
+    return (float(max(dP.max(), dQ.max())) / N)**0.5
+
+
+def hausdorff_neighbors(P, Q):
+    """Find the Hausdorff neighbors of two paths.
+
+    Same interface and result as
+    :func:`MDAnalysis.analysis.psa.hausdorff_neighbors`, which is used by
+    :meth:`PSAnalysis.run_pairs_analysis`.
+
+    :Arguments:
+      *P*
+         numpy.ndarray, path with shape (n_frames, N, 3) or (n_frames, 3N)
+      *Q*
+         numpy.ndarray, path with the same number of atoms as *P*
+
+    :Returns:
+      dict, with keys 'frames' and 'distances', each a tuple holding the
+      nearest neighbor frames (distances) of the frames of *P* in *Q*, and of
+      the frames of *Q* in *P*
+    """
+    N, d = _distance_matrix(P, Q)
+    dP, iP, dQ, iQ = _nearest_neighbors(d)
+    nearest_neighbors = {
+        'frames': (iP, iQ),
+        'distances': ((dP.astype(np.float64) / N)**0.5,
+                      (dQ.astype(np.float64) / N)**0.5)
+    }
+    return nearest_neighbors
+
+
+def linkage(y, method='single', metric='euclidean', optimal_ordering=False):
+    """Perform hierarchical (agglomerative) clustering with :mod:`fastcluster`.
+
+    Same interface as :func:`scipy.cluster.hierarchy.linkage`. A condensed
+    distance matrix *y*, as passed by :meth:`PSAnalysis.cluster`, is
+    clustered with :func:`fastcluster.linkage`. Observation vectors are
+    clustered with :func:`fastcluster.linkage_vector` where it supports the
+    method and metric, which avoids storing the full matrix of distances
+    between the observations.
+
+    :Arguments:
+      *y*
+         numpy.ndarray, condensed distance matrix or (n, d) array of n
+         observation vectors
+      *method*
+         string, linkage method, e.g., ``'ward'``
+      *metric*
+         string, distance metric for observation vectors
+      *optimal_ordering*
+         bool, reorder the linkage matrix so that the distance between
+         successive leaves is minimal
+
+    :Returns:
+      numpy.ndarray, (n-1, 4) linkage matrix
+    """
+    y = np.asarray(y)
+    if (y.ndim == 2 and metric == 'euclidean'
+            and method in ('single', 'ward', 'centroid', 'median')):
+        Z = fastcluster.linkage_vector(y, method=method, metric=metric)
+    else:
+        Z = fastcluster.linkage(y, method=method, metric=metric)
+    if optimal_ordering:
+        Z = hier.optimal_leaf_ordering(Z, y, metric=metric)
+    return Z
+
+
+def install():
+    """Replace the path metrics in :mod:`MDAnalysis.analysis.psa` with the
+    compiled versions in this module, and the linkage function of
+    :mod:`scipy.cluster.hierarchy` with :func:`linkage`.
+
+    :func:`MDAnalysis.analysis.psa.get_path_metric_func` (and
+    :class:`PSAPair` for the nearest neighbors) look metrics up by name in
+    the namespace of the module they are defined in, and
+    :meth:`PSAnalysis.cluster` looks up ``linkage`` in
+    :mod:`scipy.cluster.hierarchy` when it is called, so :class:`PSAnalysis`
+    uses the replacements from then on. The metrics are replaced both in
+    :mod:`MDAnalysis.analysis.psa` and in the defining modules, which differ
+    when :mod:`MDAnalysis.analysis.psa` only re-exports another package.
+    """
+    modules = set([psa, sys.modules[psa.get_path_metric_func.__module__],
+                   sys.modules[psa.PSAPair.__module__]])
+    for module in modules:
+        module.discrete_frechet = discrete_frechet
+        module.hausdorff = hausdorff
+        module.hausdorff_neighbors = hausdorff_neighbors
+    hier.linkage = linkage
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel all-pairs path comparison for PSA
+==========================================
+
+The distance matrix computed by :meth:`PSAnalysis.run` consists of N(N-1)/2
+independent path comparisons that are evaluated one after the other.
+:func:`parallel_run` computes the same matrix with the comparisons distributed
+over all available cores by :mod:`joblib`:
+
+>>> from psa_parallel import parallel_run
+>>> psa_short.generate_paths()
+>>> parallel_run(psa_short, 'discrete_frechet')
+>>> psa_short.plot(filename='df_ward_psa-short.pdf', linkage='ward')
+
+The comparisons are handed out in blocks of pairs between two small groups
+(tiles) of paths, which keeps the number of tasks small, and each task is only
+sent the paths of its two tiles.
+
+"""
+
+import numpy as np
+from joblib import Parallel, delayed
+
+import MDAnalysis.analysis.psa as psa
+
+
+def _blocks(numpaths, tile):
+    """Generate the pairs (i, j), i < j, of paths grouped in blocks.
+
+    :Arguments:
+      *numpaths*
+         int, number of paths
+      *tile*
+         int, number of paths in a tile; a block contains the (at most
+         *tile* x *tile*) pairs between two tiles
+
+    :Returns:
+      generator of lists of (i, j) tuples
+    """
+    for bi in range(0, numpaths, tile):
+        for bj in range(bi, numpaths, tile):
+            pairs = [(i, j) for i in range(bi, min(bi + tile, numpaths))
+                     for j in range(max(bj, i + 1), min(bj + tile, numpaths))]
+            if pairs:
+                yield pairs
+
+
+def _one_block(paths, pairs, metric_func):
+    """Return the distances between the pairs of paths of one block.
+
+    :Arguments:
+      *paths*
+         dict, path arrays of the block, keyed by path index
+      *pairs*
+         list of (i, j) tuples, the pairs of path indices to compare
+      *metric_func*
+         function, path metric
+
+    :Returns:
+      list of floats, distances in the order of *pairs*
+    """
+    return [metric_func(paths[i], paths[j]) for i, j in pairs]
+
+
+def parallel_run(psa_obj, metric='hausdorff', n_jobs=-1, tile=4):
+    """Compute the distance matrix of all pairs of paths in parallel.
+
+    Equivalent to ``psa_obj.run(metric=metric)``: the (symmetric) distance
+    matrix is stored in ``psa_obj.D``.
+
+    Path arrays are handed to the worker processes as read-only memory maps
+    instead of being pickled for every comparison.
+
+    :Arguments:
+      *psa_obj*
+         :class:`PSAnalysis`, with paths already generated
+      *metric*
+         string, name of the path metric (see
+         :func:`MDAnalysis.analysis.psa.get_path_metric_func`)
+      *n_jobs*
+         int, number of worker processes (-1 uses all cores)
+      *tile*
+         int, number of paths per tile of a block of comparisons
+    """
+    # Resolve the metric here so that replacements installed in this process
+    # (e.g. by psa_kernels.install) are also used by the workers
+    metric_func = psa.get_path_metric_func(metric)
+    paths = psa_obj.paths
+    numpaths = len(paths)
+    blocks = list(_blocks(numpaths, tile))
+    dists = Parallel(n_jobs=n_jobs, backend='loky', max_nbytes='1K',
+                     mmap_mode='r')(
+        delayed(_one_block)(
+            dict((k, paths[k]) for pair in pairs for k in pair),
+            pairs, metric_func)
+        for pairs in blocks)
+
+    D = np.zeros((numpaths, numpaths))
+    for pairs, block_dists in zip(blocks, dists):
+        for (i, j), d in zip(pairs, block_dists):
+            D[i, j] = D[j, i] = d
+    psa_obj.D = D
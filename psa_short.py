@@ -35,9 +35,13 @@ hierarchical clustering of the distance matrix is also written to
 
 """
 
-from MDAnalysis import Universe
 from MDAnalysis.analysis.psa import PSAnalysis
 
+import psa_cache
+import psa_kernels
+import psa_sims
+from psa_parallel import parallel_run
+
 if __name__ == '__main__':
 
     print("Building collection of simulations...")
@@ -45,45 +49,34 @@ if __name__ == '__main__':
     method_names = ['DIMS', 'FRODA', 'GOdMD', 'MDdMD', 'rTMD-F', 'rTMD-S',      \
                     'ANMP', 'iENM', 'MAP', 'MENM-SD', 'MENM-SP',                \
                     'Morph', 'LinInt']
-    labels = [] # Heat map labels
-    simulations = [] # List of simulation topology/trajectory filename pairs
-    universes = [] # List of MDAnalysis Universes representing simulations
-
-    # Build list of simulations, each represented by a pair of filenames
-    # ([topology filename], [trajectory filename]). Generate corresponding label
-    # list.
-    for method in method_names:
-        # Note: DIMS uses the PSF topology format
-        topname = 'top.psf' if 'DIMS' in method or 'TMD' in method else 'top.pdb'
-        pathname = 'fitted_psa.dcd'
-        method_dir = 'methods/{}'.format(method)
-        if method is not 'LinInt':
-            for run in xrange(1, 4): # 3 runs per method
-                run_dir = '{}/{:03n}'.format(method_dir, run)
-                topology = '{}/{}'.format(method_dir, topname)
-                trajectory = '{}/{}'.format(run_dir, pathname)
-                labels.append(method + '(' + str(run) + ')')
-                simulations.append((topology, trajectory))
-        else: # only one LinInt trajectory
-            topology = '{}/{}'.format(method_dir, topname)
-            trajectory = '{}/{}'.format(method_dir, pathname)
-            labels.append(method)
-            simulations.append((topology, trajectory))
-
-    # Generate simulation list represented as Universes. Each item, sim, in
-    # simulations is a topology/trajectory filename pair that is unpacked into
-    # an argument list with the "splat" ("*") operator.
-    for sim in simulations:
-        universes.append(Universe(*sim))
+
+    # Build list of simulations, each represented by a triple
+    # ([topology filename], [trajectory filename], [heat map label]), with
+    # three runs per method and only one LinInt trajectory.
+    simulations = [psa_sims.simulation(method, run)
+                   for method in method_names
+                   for run in ([None] if method == 'LinInt' else range(1, 4))]
+    labels = [label for _, _, label in simulations] # Heat map labels
+
+    # Generate simulation list represented as Universes. Universes are read in
+    # a thread pool, so that reading of the trajectory files overlaps; they are
+    # read on every run, even when the paths are loaded from the cache.
+    universes = psa_sims.load_universes(simulations)
 
     print("Initializing Path Similarity Analysis...")
     psa_short = PSAnalysis(universes, path_select='name CA', labels=labels)
 
     print("Generating Path objects from trajectories...")
-    psa_short.generate_paths()
+    # Paths only depend on the trajectory files and the path selection, so
+    # they are cached in the 'cache' directory and reused on subsequent runs
+    input_files = [filename for sim in simulations for filename in sim[:2]]
+    psa_cache.generate_paths(psa_short, input_files)
+
+    # Use the compiled path metrics and clustering for the analyses below
+    psa_kernels.install()
 
     print("Calculating Hausdorff distance matrix...")
-    psa_short.run(metric='hausdorff')
+    psa_cache.run(psa_short, 'hausdorff', input_files, runner=parallel_run)
 
     print("Plotting heat map-dendrogram for hierarchical (Ward) clustering...")
     psa_short.plot(filename='dh_ward_psa-short.pdf', linkage='ward');
@@ -93,7 +86,7 @@ if __name__ == '__main__':
                                      linkage='ward');
 
     print("Calculating (discrete) Fréchet distance matrix...")
-    psa_short.run(metric='discrete_frechet')
+    psa_cache.run(psa_short, 'discrete_frechet', input_files, runner=parallel_run)
 
     print("Plotting heat map-dendrogram for hierarchical (Ward) clustering...")
     psa_short.plot(filename='df_ward_psa-short.pdf', linkage='ward');
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Simulations of the PSA tutorial
+===============================
+
+Helpers shared by the example scripts to build the list of simulations in the
+``methods`` directory and to read them as MDAnalysis Universes:
+
+>>> import psa_sims
+>>> simulations = [psa_sims.simulation(method, run)
+...                for method in method_names for run in (1, 2, 3)]
+>>> universes = psa_sims.load_universes(simulations)
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from MDAnalysis import Universe
+
+
+def simulation(method, run=None, pathname='fitted_psa.dcd'):
+    """Return the (topology, trajectory, label) triple of a simulation.
+
+    :Arguments:
+      *method*
+         string, name of the method (same as its directory name)
+      *run*
+         int, run number; ``None`` for the single LinInt trajectory, which is
+         stored directly in the method directory
+      *pathname*
+         string, file name of the trajectory [``'fitted_psa.dcd'``]
+    """
+    # Note: DIMS uses the PSF topology format
+    topname = 'top.psf' if 'DIMS' in method or 'TMD' in method else 'top.pdb'
+    method_dir = f'methods/{method}'
+    topology = f'{method_dir}/{topname}'
+    if run is None:
+        return topology, f'{method_dir}/{pathname}', method
+    run_dir = f'{method_dir}/{run:03d}'
+    trajectory = f'{run_dir}/{pathname}'
+    return topology, trajectory, f'{method}({run})'
+
+
+def load_universes(simulations, max_workers=8):
+    """Return the Universes of *simulations*.
+
+    The Universes are read from the topology and trajectory files in a thread
+    pool, so that reading of the files overlaps.
+
+    :Arguments:
+      *simulations*
+         list of (topology, trajectory, label) tuples of filenames and labels
+      *max_workers*
+         int, number of threads used to read the files [8]
+
+    :Returns:
+      list of :class:`Universe`, in the order of *simulations*
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda sim: Universe(*sim[:2]), simulations))